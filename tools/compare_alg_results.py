@@ -0,0 +1,174 @@
+import argparse
+import sys
+import yaml
+from pathlib import Path
+from typing import Dict, List, Tuple, Any
+import numpy as np
+
+from schedule_files import extract_agent_count, read_first_n_lines
+
+# Metrics where a larger candidate value means the solver got worse
+REGRESSION_METRICS: List[str] = [
+        'runtime',
+        'highLevelExpanded',
+        'lowLevelExpanded',
+    ]
+
+# Single-run wall-clock metrics, gated on the lower CI bound so timing noise does not fail the gate
+NOISY_METRICS: List[str] = [
+        'runtime',
+    ]
+
+# Values are clipped to this floor before taking ratios, so that
+# sub-millisecond runtimes and empty searches do not blow up the ratio
+metric_floor = {
+    "runtime": 1e-3,
+    "highLevelExpanded": 1,
+    "lowLevelExpanded": 1,
+}
+
+def load_instance_metrics(dir_path: Path, metrics: List[str], subdir_path: str) -> Dict[Tuple[str, int], Dict[str, float]]:
+    # {(scenario_name, agent_count): {metric: value}}
+    data: Dict[Tuple[str, int], Dict[str, float]] = {}
+    for scenario_dir in dir_path.iterdir():
+        if not scenario_dir.is_dir() or scenario_dir.name.find("analysis") != -1:
+            continue
+        subdir = scenario_dir / subdir_path
+        if not subdir.exists():
+            print(f"Subdirectory {subdir} does not exist, skipping.")
+            continue
+        for sched_file in subdir.glob("*_agents.yaml"):
+            agent_count = extract_agent_count(sched_file.name)
+            if agent_count is None:
+                continue
+            try:
+                sched_data: dict[str, Any] = yaml.safe_load(read_first_n_lines(sched_file))
+                statistics = sched_data.get("statistics", {})
+                data[(scenario_dir.name, agent_count)] = {
+                    metric: statistics[metric] for metric in metrics if metric in statistics
+                }
+            except Exception as e:
+                print(f"Error reading {sched_file}: {e}")
+    return data
+
+def pair_instances(
+    baseline: Dict[Tuple[str, int], Dict[str, float]],
+    candidate: Dict[Tuple[str, int], Dict[str, float]],
+    metric: str
+) -> Tuple[np.ndarray, np.ndarray]:
+    keys = sorted(k for k in baseline.keys() & candidate.keys()
+                  if metric in baseline[k] and metric in candidate[k])
+    base = np.array([baseline[k][metric] for k in keys], dtype=float)
+    cand = np.array([candidate[k][metric] for k in keys], dtype=float)
+    return base, cand
+
+def bootstrap_ratio_ci(
+    log_ratios: np.ndarray,
+    n_resamples: int = 10000,
+    confidence: float = 0.95,
+    seed: int | None = None
+) -> Tuple[float, float, float]:
+    """
+    Returns:
+        (geometric mean ratio, lower bound, upper bound) of candidate / baseline.
+        All resamples are drawn as one (n_resamples, n) index matrix.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(log_ratios)
+    idx = rng.integers(0, n, size=(n_resamples, n))
+    resampled_means = log_ratios[idx].mean(axis=1)
+    alpha = (1.0 - confidence) / 2.0
+    lower, upper = np.quantile(resampled_means, [alpha, 1.0 - alpha])
+    return float(np.exp(log_ratios.mean())), float(np.exp(lower)), float(np.exp(upper))
+
+def compare(
+    baseline: Dict[Tuple[str, int], Dict[str, float]],
+    candidate: Dict[Tuple[str, int], Dict[str, float]],
+    metrics: List[str],
+    threshold: float = 1.05,
+    runtime_threshold: float = 1.10,
+    n_resamples: int = 10000,
+    confidence: float = 0.95,
+    seed: int | None = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Deterministic metrics regress if their ratio exceeds threshold, metrics in
+    NOISY_METRICS only if their lower CI bound exceeds runtime_threshold.
+    Returns:
+        results: {metric: {num_pairs, ratio, ci_lower, ci_upper, regression}}
+    """
+    results: Dict[str, Dict[str, Any]] = {}
+    for metric in metrics:
+        base, cand = pair_instances(baseline, candidate, metric)
+        if len(base) == 0:
+            print(f"No paired instances for metric '{metric}', skipping.")
+            continue
+        floor = metric_floor.get(metric, 0.0)
+        log_ratios = np.log(np.maximum(cand, floor)) - np.log(np.maximum(base, floor))
+        ratio, lower, upper = bootstrap_ratio_ci(log_ratios, n_resamples, confidence, seed)
+        if metric in NOISY_METRICS:
+            regression = lower > runtime_threshold
+        else:
+            regression = ratio > threshold
+        results[metric] = {
+            "num_pairs": int(len(base)),
+            "ratio": ratio,
+            "ci_lower": lower,
+            "ci_upper": upper,
+            "regression": bool(regression),
+        }
+    return results
+
+def main(args: argparse.Namespace) -> int:
+    baseline_dir: Path = Path(args.baseline_dir)
+    candidate_dir: Path = Path(args.candidate_dir)
+    candidate_subdir = args.candidate_subdir_path if args.candidate_subdir_path is not None else args.subdir_path
+    metrics: List[str] = args.metrics
+
+    baseline = load_instance_metrics(baseline_dir, metrics, args.subdir_path)
+    candidate = load_instance_metrics(candidate_dir, metrics, candidate_subdir)
+
+    lost = sorted(baseline.keys() - candidate.keys())
+    gained = sorted(candidate.keys() - baseline.keys())
+    print(f"Baseline instances: {len(baseline)}, candidate instances: {len(candidate)}")
+    print(f"Solved only by baseline: {len(lost)}, solved only by candidate: {len(gained)}")
+    for scenario_name, agent_count in lost:
+        print(f"  lost: {scenario_name} with {agent_count} agents")
+
+    results = compare(baseline, candidate, metrics, args.threshold, args.runtime_threshold,
+                      args.n_resamples, args.confidence, args.seed)
+    for metric, res in results.items():
+        status = "REGRESSION" if res["regression"] else "ok"
+        print(f"{metric}: ratio {res['ratio']:.3f} "
+              f"[{res['ci_lower']:.3f}, {res['ci_upper']:.3f}] "
+              f"over {res['num_pairs']} pairs -> {status}")
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            yaml.dump({"lost_instances": len(lost), "gained_instances": len(gained), "metrics": results}, f)
+        print(f"Comparison saved to {args.output}")
+
+    failed = any(res["regression"] for res in results.values())
+    if len(lost) > args.max_lost:
+        print(f"Candidate lost {len(lost)} solved instances (allowed: {args.max_lost})")
+        failed = True
+    return 1 if failed else 0
+
+def get_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compare baseline and candidate MAPF schedules per instance and fail on performance regressions.")
+    parser.add_argument("baseline_dir", help="Directory containing baseline scenario subdirectories")
+    parser.add_argument("candidate_dir", help="Directory containing candidate scenario subdirectories")
+    parser.add_argument("--subdir_path", type=str, default="schedules", help="Path to schedule subdirectory within each scenario (default: schedules)")
+    parser.add_argument("--candidate_subdir_path", type=str, default=None, help="Schedule subdirectory for the candidate (default: same as --subdir_path)")
+    parser.add_argument("--metrics", nargs="+", default=REGRESSION_METRICS, help="Metrics to compare (default: runtime highLevelExpanded lowLevelExpanded)")
+    parser.add_argument("--threshold", type=float, default=1.05, help="Maximum allowed geometric mean candidate/baseline ratio of node expansion counts (default: 1.05)")
+    parser.add_argument("--runtime_threshold", type=float, default=1.10, help="Maximum allowed lower CI bound of the candidate/baseline runtime ratio (default: 1.10)")
+    parser.add_argument("--confidence", type=float, default=0.95, help="Bootstrap confidence level (default: 0.95)")
+    parser.add_argument("--n_resamples", type=int, default=10000, help="Number of bootstrap resamples (default: 10000)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for bootstrap resampling (default: 0)")
+    parser.add_argument("--max_lost", type=int, default=0, help="Fail if the candidate misses more baseline-solved instances (default: 0)")
+    parser.add_argument("--output", type=str, default=None, help="Optional YAML file to save the comparison to")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    sys.exit(main(get_args()))
@@ -1,12 +1,12 @@
 import argparse
 import yaml
-import re
 from pathlib import Path
 import matplotlib.pyplot as plt
 from collections import defaultdict
 from typing import Dict, List, Any, DefaultDict
 from calculate_averages import compute_averages, save_global_averages_by_scenario, count_fast_scenarios
 from plot_all_alg_results import load_metrics
+from schedule_files import extract_agent_count, read_first_n_lines
 import numpy as np
 
 ALL_METRICS: List[str] = [
@@ -30,20 +30,10 @@ metric_fitting_degree = {
     "makespan": 2,
 }
 
-def extract_agent_count(filename: str) -> int | None:
-    # Assumes filename like schedule_inputs_10_agents.yaml
-    match = re.search(r'_(\d+)_agents', filename)
-    return int(match.group(1)) if match else None
-
 def extract_scenario_type(dirname: str) -> str:
     # Assumes dirname like random-1, even-2, etc.
     return dirname.split('-')[0]
 
-def read_first_n_lines(file_path: Path, n: int = 6) -> str:
-    with open(file_path, 'r') as f:
-        lines = [next(f) for _ in range(n)]
-    return "".join(lines)
-
 def traverse_subdirs_and_load_metrics(dir_path: Path, metrics: List[str], subdir_path: str) -> Dict[str, DefaultDict[str, DefaultDict[int, List[float]]]]:
     # {scenario_type: {agent_count: [metric_values]}}
     data: Dict[str, DefaultDict[str, DefaultDict[int, List[float]]]] = {
@@ -3,89 +3,202 @@ import yaml
 import numpy as np
 import argparse
 import os
+import hashlib
 
-import uav_trajectory
-
-# returns maximum velocity, acceleration
-def findMaxDynamicLimits(traj):
-  vmax = 0
-  amax = 0
-  for t in np.arange(0, traj.duration, 0.1):
-    e = traj.eval(t)
-    vmax = max(vmax, np.linalg.norm(e.vel))
-    amax = max(amax, np.linalg.norm(e.acc))
-  return vmax, amax
-
-# returns upper bound stretchtime factor
-def upperBound(traj, vmax, amax):
-  stretchtime = 1.0
-  while True:
-    v,a = findMaxDynamicLimits(traj)
-    if v <= vmax and a <= amax:
-      # print(v,a)
-      return stretchtime
-    traj.stretchtime(2.0)
-    stretchtime = stretchtime * 2.0
-
-# returns lower bound stretchtime factor
-def lowerBound(traj, vmax, amax):
-  stretchtime = 1.0
-  while True:
-    v,a = findMaxDynamicLimits(traj)
-    if v >= vmax and a >= amax:
-      # print(v,a)
-      return stretchtime
-    traj.stretchtime(0.5)
-    stretchtime = stretchtime * 0.5
-
-def findStretchtime(file, vmax, amax):
-  traj = uav_trajectory.Trajectory()
-  traj.loadcsv(file)
-  L = lowerBound(traj, vmax, amax)
-  traj.loadcsv(file)
-  U = upperBound(traj, vmax, amax)
-  while True:
-    # print("L ", L)
-    # print("U ", U)
-    if U - L < 0.1:
-      return U
-    middle = (L + U) / 2
-    # print("try: ", middle)
-    traj.loadcsv(file)
-    traj.stretchtime(middle)
-    v,a = findMaxDynamicLimits(traj)
-    # print("v,a ", v, a)
-    if v <= vmax and a <= amax:
-      U = middle
+def loadAgentTypes(typesFile):
+  with open(typesFile) as file:
+    types = yaml.safe_load(file)
+  agentTypes = dict()
+  for agentType in types["agentTypes"]:
+    agentTypes[agentType["type"]] = agentType
+  return agentTypes
+
+def loadAgents(agentsFile):
+  with open(agentsFile) as file:
+    return yaml.safe_load(file)["agents"]
+
+# cache key: csv content hash plus the dynamic limits and sampling it was checked with
+def cacheKey(file, vmax, amax, samples):
+  with open(file, "rb") as f:
+    digest = hashlib.sha1(f.read()).hexdigest()
+  return "{}_{}_{}_{}".format(digest, vmax, amax, samples)
+
+def loadCache(cacheFile):
+  if cacheFile is None or not os.path.exists(cacheFile):
+    return dict()
+  with open(cacheFile) as file:
+    return yaml.safe_load(file) or dict()
+
+def saveCache(cacheFile, cache):
+  if cacheFile is None:
+    return
+  with open(cacheFile, "w") as file:
+    yaml.dump(cache, file)
+
+# returns piece durations (P,) and x/y/z coefficients (P, 3, 8) of a csv trajectory
+def loadPieces(file):
+  data = np.loadtxt(file, delimiter=",", skiprows=1, usecols=range(33), ndmin=2)
+  return data[:,0], data[:,1:25].reshape(-1, 3, 8)
+
+# evaluates polynomials with coefficients (P, 3, D) at times (P, K), returns (P, 3, K)
+def evalPolynomials(coeffs, t):
+  x = np.zeros((coeffs.shape[0], coeffs.shape[1], t.shape[1]))
+  for i in reversed(range(coeffs.shape[2])):
+    x = x * t[:,None,:] + coeffs[:,:,i,None]
+  return x
+
+# returns maximum velocity, acceleration of every agent, evaluated over all pieces at once
+def findMaxDynamicLimitsBatch(durations, coeffs, starts, samples):
+  degree = np.arange(1, coeffs.shape[2])
+  vel = coeffs[:,:,1:] * degree
+  acc = vel[:,:,1:] * degree[:-1]
+  t = durations[:,None] * np.linspace(0, 1, samples)
+  vmax = np.linalg.norm(evalPolynomials(vel, t), axis=1).max(axis=1)
+  amax = np.linalg.norm(evalPolynomials(acc, t), axis=1).max(axis=1)
+  return np.maximum.reduceat(vmax, starts), np.maximum.reduceat(amax, starts)
+
+# stretching time by s scales velocity by 1/s and acceleration by 1/s^2
+def findStretchtimes(files, vmax, amax, samples=100):
+  pieces = [loadPieces(file) for file in files]
+  counts = np.array([len(d) for d, _ in pieces])
+  starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+  durations = np.concatenate([d for d, _ in pieces])
+  coeffs = np.concatenate([c for _, c in pieces])
+
+  v, a = findMaxDynamicLimitsBatch(durations, coeffs, starts, samples)
+  stretchtimes = np.maximum(v / vmax, np.sqrt(a / amax))
+  return stretchtimes, np.add.reduceat(durations, starts)
+
+# returns {name: {type, stretchtime, duration}}, evaluating agents missing from cache type by type
+def computeStretchtimes(folder, agentTypes, agents, cache, samples=100):
+  keys = dict()
+  missing = dict()
+  for agent in agents:
+    agentType = agentTypes[agent["type"]]
+    file = os.path.join(folder, agent["name"] + ".csv")
+    keys[agent["name"]] = cacheKey(file, agentType["v_max"], agentType["a_max"], samples)
+    if keys[agent["name"]] not in cache:
+      missing.setdefault(agent["type"], []).append((keys[agent["name"]], file))
+
+  for typeName, entries in missing.items():
+    agentType = agentTypes[typeName]
+    stretchtimes, durations = findStretchtimes([file for _, file in entries], agentType["v_max"], agentType["a_max"], samples)
+    for (key, _), stretchtime, duration in zip(entries, stretchtimes.tolist(), durations.tolist()):
+      cache[key] = {"stretchtime": stretchtime, "duration": duration}
+
+  return {agent["name"]: dict(type=agent["type"], **cache[keys[agent["name"]]]) for agent in agents}
+
+def groupByType(results):
+  perType = dict()
+  for name, r in results.items():
+    t = perType.setdefault(r["type"], {"agents": dict(), "durations": dict()})
+    t["agents"][name] = r["stretchtime"]
+    t["durations"][name] = r["duration"]
+  for t in perType.values():
+    t["bottleneck"] = max(t["agents"], key=t["agents"].get)
+    t["stretchtime"] = t["agents"][t["bottleneck"]]
+  return perType
+
+# batch file lists experiments as {folder, typesFile, agentsFile, optional name}, paths relative to the batch file
+def experimentName(experiment):
+  return experiment.get("name", "{}:{}:{}".format(experiment["folder"], experiment["agentsFile"], experiment["typesFile"]))
+
+def runBatch(batchFile, cache, cacheFile, perType=False, samples=100):
+  with open(batchFile) as file:
+    batch = yaml.safe_load(file)
+  root = os.path.dirname(os.path.abspath(batchFile))
+
+  summary = dict()
+  for experiment in batch["experiments"]:
+    name = experimentName(experiment)
+    if name in summary:
+      raise ValueError("duplicate experiment in batch file: {}".format(name))
+    folder = os.path.join(root, experiment["folder"])
+    agentTypes = loadAgentTypes(os.path.join(root, experiment["typesFile"]))
+    agents = loadAgents(os.path.join(root, experiment["agentsFile"]))
+    # keep stretchtimes computed so far even if a later experiment fails
+    try:
+      results = computeStretchtimes(folder, agentTypes, agents, cache, samples)
+    finally:
+      saveCache(cacheFile, cache)
+    if perType:
+      summary[name] = summarizePerType(groupByType(results))
+      print("{}: common stretchtime: {}, mission time saved if decoupled: {}".format(
+        name, summary[name]["common_stretchtime"], summary[name]["mission_time_saved"]))
     else:
-      L = middle
+      summary[name] = max((r["stretchtime"] for r in results.values()), default=0.0)
+      print("{}: common stretchtime: {}".format(name, summary[name]))
+  return summary
+
+# compares mission time when all types share the global factor vs. each type using its own
+def summarizePerType(perType):
+  common = max((r["stretchtime"] for r in perType.values()), default=0.0)
+  summary = {"common_stretchtime": common, "types": dict()}
+  for typeName, r in perType.items():
+    longest = max(r["durations"].values())
+    summary["types"][typeName] = {
+      "agents": r["agents"],
+      "bottleneck": r["bottleneck"],
+      "stretchtime": r["stretchtime"],
+      "mission_time_common": longest * common,
+      "mission_time_decoupled": longest * r["stretchtime"],
+      "time_saved": longest * (common - r["stretchtime"]),
+    }
+  missionCommon = max((t["mission_time_common"] for t in summary["types"].values()), default=0.0)
+  missionDecoupled = max((t["mission_time_decoupled"] for t in summary["types"].values()), default=0.0)
+  summary["mission_time_common"] = missionCommon
+  summary["mission_time_decoupled"] = missionDecoupled
+  summary["mission_time_saved"] = missionCommon - missionDecoupled
+  return summary
 
 
 if __name__ == "__main__":
   parser = argparse.ArgumentParser()
-  parser.add_argument("folder", type=str, help="input folder containing csv files")
-  parser.add_argument("typesFile", help="types file for agent types (yaml)")
-  parser.add_argument("agentsFile", help="agents file with agents (yaml)")
+  parser.add_argument("folder", type=str, nargs="?", help="input folder containing csv files")
+  parser.add_argument("typesFile", nargs="?", help="types file for agent types (yaml)")
+  parser.add_argument("agentsFile", nargs="?", help="agents file with agents (yaml)")
+  parser.add_argument("--batch", type=str, default=None, help="yaml file listing experiments (folder, typesFile, agentsFile) to process")
+  parser.add_argument("--cache", type=str, default=None, help="yaml file caching stretchtimes by csv hash, v_max/a_max and samples")
+  parser.add_argument("--summary", type=str, default=None, help="yaml file to write common stretchtimes (or per-type reports with --per_type) to")
+  parser.add_argument("--per_type", action="store_true", help="compute stretchtimes grouped by agent type and report time saved by decoupling types")
+  parser.add_argument("--samples", type=int, default=100, help="samples per polynomial piece when evaluating velocity and acceleration (default: 100)")
   args = parser.parse_args()
 
-  with open(args.typesFile) as file:
-    types = yaml.load(file)
+  cache = loadCache(args.cache)
 
-  with open(args.agentsFile) as file:
-    agents = yaml.load(file)
+  if args.batch is not None:
+    summary = runBatch(args.batch, cache, args.cache, args.per_type, args.samples)
+    if args.summary is not None:
+      with open(args.summary, "w") as file:
+        yaml.dump(summary, file)
+      print("summary saved to {}".format(args.summary))
+  else:
+    if args.folder is None or args.typesFile is None or args.agentsFile is None:
+      parser.error("folder, typesFile and agentsFile are required without --batch")
 
-  agentTypes = dict()
-  for agentType in types["agentTypes"]:
-    agentTypes[agentType["type"]] = agentType
+    agentTypes = loadAgentTypes(args.typesFile)
+    agents = loadAgents(args.agentsFile)
+    results = computeStretchtimes(args.folder, agentTypes, agents, cache, args.samples)
+    saveCache(args.cache, cache)
 
-  result = 0.0
-  for agent in agents["agents"]:
-    name = agent["name"]
-    agentType = agentTypes[agent["type"]]
-    vmax = agentType["v_max"]
-    amax = agentType["a_max"]
-    stretchtime = findStretchtime(os.path.join(args.folder, name + ".csv"), vmax, amax)
-    print(name, stretchtime)
-    result = max(result, stretchtime)
-
-  print("common stretchtime: {}".format(result))
+    if args.per_type:
+      summary = summarizePerType(groupByType(results))
+      for typeName, t in summary["types"].items():
+        print("{}: stretchtime: {} (bottleneck: {}), time saved if decoupled: {}".format(
+          typeName, t["stretchtime"], t["bottleneck"], t["time_saved"]))
+      print("common stretchtime: {}".format(summary["common_stretchtime"]))
+      print("mission time saved if decoupled: {}".format(summary["mission_time_saved"]))
+      if args.summary is not None:
+        with open(args.summary, "w") as file:
+          yaml.dump(summary, file)
+        print("summary saved to {}".format(args.summary))
+    else:
+      stretchtimes = {name: r["stretchtime"] for name, r in results.items()}
+      common = max(stretchtimes.values(), default=0.0)
+      for name, stretchtime in stretchtimes.items():
+        print(name, stretchtime)
+      print("common stretchtime: {}".format(common))
+      if args.summary is not None:
+        with open(args.summary, "w") as file:
+          yaml.dump({"common_stretchtime": common, "agents": stretchtimes}, file)
+        print("summary saved to {}".format(args.summary))
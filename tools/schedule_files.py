@@ -0,0 +1,12 @@
+import re
+from pathlib import Path
+
+def extract_agent_count(filename: str) -> int | None:
+    # Assumes filename like schedule_inputs_10_agents.yaml
+    match = re.search(r'_(\d+)_agents', filename)
+    return int(match.group(1)) if match else None
+
+def read_first_n_lines(file_path: Path, n: int = 6) -> str:
+    with open(file_path, 'r') as f:
+        lines = [next(f) for _ in range(n)]
+    return "".join(lines)